@@ -0,0 +1,22 @@
+"""Jinja environment shared by the code generators."""
+
+import functools
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+
+@functools.cache
+def env() -> "Environment":
+    # Imported here so runtime-only commands don't pay for loading Jinja
+    from jinja2 import Environment, PackageLoader
+
+    return Environment(
+        loader=PackageLoader("bakelite.generator", "templates"),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        line_comment_prefix="%%",
+        line_statement_prefix="%",
+    )
@@ -5,7 +5,12 @@ from pathlib import Path
 
 import click
 
-from bakelite.generator import cpptiny, parse, python
+from bakelite.generator import parse
+
+
+def _write_output(path: str | Path, content: str) -> None:
+    """Write generated content as UTF-8 in a single call, with LF line endings."""
+    Path(path).write_bytes(content.encode("utf-8"))
 
 
 @click.group()
@@ -27,24 +32,28 @@ def cli() -> None:
 )
 def gen(language: str, input_file: str, output_file: str, runtime_import: str | None) -> None:
     """Generate protocol code from a definition file."""
-    with open(input_file, encoding="utf-8") as f:
-        proto = f.read()
+    proto = Path(input_file).read_bytes().decode("utf-8")
+    if "\r" in proto:
+        # Match text-mode universal newlines; comments would otherwise keep the \r
+        proto = proto.replace("\r\n", "\n").replace("\r", "\n")
 
     proto_def = parse(proto)
 
+    # Generators are imported per language so a run only loads the one it uses
     if language == "python":
+        from bakelite.generator import python
+
         # Default to "bakelite_runtime" (relative import) if not specified
         import_path = runtime_import if runtime_import is not None else "bakelite_runtime"
-        generated_file = python.render(*proto_def, runtime_import=import_path)
+        _write_output(output_file, python.render(*proto_def, runtime_import=import_path))
     elif language == "cpptiny":
-        generated_file = cpptiny.render(*proto_def)
+        from bakelite.generator import cpptiny
+
+        _write_output(output_file, cpptiny.render(*proto_def))
     else:
         print(f"Unknown language: {language}")
         sys.exit(1)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(generated_file)
-
 
 @cli.command()
 @click.option("--language", "-l", required=True, help="Target language (python, cpptiny)")
@@ -59,16 +68,19 @@ def gen(language: str, input_file: str, output_file: str, runtime_import: str |
 def runtime(language: str, output_path: str | None, name: str) -> None:
     """Generate runtime support code."""
     if language == "cpptiny":
+        from bakelite.generator import cpptiny
+
         output_path = output_path or "bakelite.h"
         generated_file = cpptiny.runtime()
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(generated_file)
+        _write_output(output_path, generated_file)
     elif language == "python":
+        from bakelite.generator import python
+
         output_path = output_path or "."
         runtime_dir = Path(output_path) / name
         runtime_dir.mkdir(parents=True, exist_ok=True)
-        for filename, content in python.runtime().items():
-            (runtime_dir / filename).write_text(content, encoding="utf-8")
+        for file_name, content in python.runtime().items():
+            _write_output(runtime_dir / file_name, content)
         print(f"Generated Python runtime in {runtime_dir}")
     else:
         print(f"Unknown language: {language}")
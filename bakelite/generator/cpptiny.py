@@ -1,22 +1,38 @@
 """C++ (tiny) code generator for bakelite protocols."""
 
+import functools
+import hashlib
 import os
-from copy import copy
-
-from jinja2 import Environment, PackageLoader
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
+from ._env import env
 from .types import Protocol, ProtoEnum, ProtoStruct, ProtoStructMember, ProtoType
 
-env = Environment(
-    loader=PackageLoader("bakelite.generator", "templates"),
-    trim_blocks=True,
-    lstrip_blocks=True,
-    keep_trailing_newline=True,
-    line_comment_prefix="%%",
-    line_statement_prefix="%",
-)
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+
+@functools.cache
+def _template() -> "Template":
+    return env().get_template("cpptiny.h.j2")
+
+
+@functools.cache
+def _runtime_template() -> "Template":
+    return env().get_template("cpptiny-bakelite.h.j2")
+
+
+# Rendered output keyed by a fingerprint of the protocol definition
+_RENDER_CACHE_SIZE = 32
+_render_cache: dict[str, str] = {}
+
+# Stands in for the member name in memoized serializer snippets
+_NAME_PLACEHOLDER = "__NAME__"
+
+# (type name, type size, array size) of a struct member
+_MemberShape = tuple[str, int | None, int | None]
 
-template = env.get_template("cpptiny.h.j2")
 
 PRIMITIVE_TYPE_MAP = {
     "bool": "bool",
@@ -34,32 +50,57 @@ PRIMITIVE_TYPE_MAP = {
     "string": "char",
 }
 
+# CRC option -> (C++ CRC type, CRC size in bytes)
+_CRC_TABLE = {
+    "none": ("CrcNoop", 0),
+    "crc8": ("Crc8", 1),
+    "crc16": ("Crc16", 2),
+    "crc32": ("Crc32", 4),
+}
+
+# Framing option -> C++ framer type
+_FRAMING_TABLE = {
+    "cobs": "CobsFramer",
+}
+
+_BYTES_STRING = frozenset({"bytes", "string"})
+_PRIMITIVE_NAMES = frozenset(PRIMITIVE_TYPE_MAP) - _BYTES_STRING
+_primitive_ctype = PRIMITIVE_TYPE_MAP.get
+
 
 def _map_type(t: ProtoType) -> str:
-    return PRIMITIVE_TYPE_MAP.get(t.name, t.name)
+    return _primitive_ctype(t.name, t.name)
 
 
 def _map_type_member(member: ProtoStructMember) -> str:
-    type_name = _map_type(member.type)
+    return _member_type_for_shape(member.type.name, member.type.size, member.array_size)
 
-    if member.type.name == "bytes" and not member.type.size and member.array_size == 0:
-        return f"Bakelite::SizedArray<Bakelite::SizedArray<{type_name}> >"
-    if member.type.name == "bytes" and not member.type.size:
-        return f"Bakelite::SizedArray<{type_name}>"
-    if member.type.name == "string" and (not member.type.size) and member.array_size == 0:
-        return f"Bakelite::SizedArray<{type_name}*>"
-    if member.type.name == "string" and (not member.type.size):
-        return f"{type_name}*"
-    if member.array_size == 0:
-        return f"Bakelite::SizedArray<{type_name}>"
-    return type_name
+
+@functools.cache
+def _member_type_for_shape(type_name: str, size: int | None, array_size: int | None) -> str:
+    c_type = PRIMITIVE_TYPE_MAP.get(type_name, type_name)
+
+    if type_name == "bytes" and not size and array_size == 0:
+        return f"Bakelite::SizedArray<Bakelite::SizedArray<{c_type}> >"
+    if type_name == "bytes" and not size:
+        return f"Bakelite::SizedArray<{c_type}>"
+    if type_name == "string" and (not size) and array_size == 0:
+        return f"Bakelite::SizedArray<{c_type}*>"
+    if type_name == "string" and (not size):
+        return f"{c_type}*"
+    if array_size == 0:
+        return f"Bakelite::SizedArray<{c_type}>"
+    return c_type
 
 
 def _size_postfix(member: ProtoStructMember) -> str:
-    if member.type.name in {"bytes", "string"}:
-        if not member.type.size:
-            return ""
-        return f"[{member.type.size}]"
+    return _size_postfix_for_shape(member.type.name, member.type.size)
+
+
+@functools.cache
+def _size_postfix_for_shape(type_name: str, size: int | None) -> str:
+    if type_name in _BYTES_STRING and size:
+        return f"[{size}]"
     return ""
 
 
@@ -71,78 +112,164 @@ def _array_postfix(member: ProtoStructMember) -> str:
 
 def overhead(size: int, crc_size: int) -> int:
     """Calculate COBS overhead for a message size."""
-    cobs_overhead = int((size + 253) / 254)
+    cobs_overhead = (size + 253) // 254
     return cobs_overhead + crc_size + 1
 
 
+def _type_registry(
+    enums: list[ProtoEnum], structs: list[ProtoStruct]
+) -> dict[str, tuple[str, str]]:
+    """Map every known type name to its (kind, underlying C type).
+
+    Enums take precedence over structs, which take precedence over primitives.
+    """
+    registry: dict[str, tuple[str, str]] = dict.fromkeys(_PRIMITIVE_NAMES, ("primitive", ""))
+    for name in _BYTES_STRING:
+        registry[name] = (name, "")
+    for struct in structs:
+        registry[struct.name] = ("struct", "")
+    for enum in enums:
+        registry[enum.name] = ("enum", _map_type(enum.type))
+    return registry
+
+
+def _sized_call(func: str, name: str, t: ProtoType) -> str:
+    if t.size:
+        return f"{func}(stream, {name}, {t.size});"
+    return f"{func}(stream, {name});"
+
+
+# Serializer call for a single (non-array) value, by registry kind. Each emitter
+# takes the value expression, its type and the underlying C type (enums only).
+_Emitter = Callable[[str, ProtoType, str], str]
+
+_ARRAY_WRITE = """writeArray(stream, {name}{size_arg}, [](T &stream, const auto &val) {{
+      return {element}
+    }});"""
+
+_ARRAY_READ = """readArray(stream, {name}{size_arg}, [](T &stream, auto &val) {{
+      return {element}
+    }});"""
+
+_WRITERS: dict[str, _Emitter] = {
+    "primitive": lambda name, t, ctype: f"write(stream, {name});",
+    "enum": lambda name, t, ctype: f"write(stream, ({ctype}){name});",
+    "struct": lambda name, t, ctype: f"{name}.pack(stream);",
+    "bytes": lambda name, t, ctype: _sized_call("writeBytes", name, t),
+    "string": lambda name, t, ctype: _sized_call("writeString", name, t),
+}
+
+_READERS: dict[str, _Emitter] = {
+    "primitive": lambda name, t, ctype: f"read(stream, {name});",
+    "enum": lambda name, t, ctype: f"read(stream, ({ctype}&){name});",
+    "struct": lambda name, t, ctype: f"{name}.unpack(stream);",
+    "bytes": lambda name, t, ctype: _sized_call("readBytes", name, t),
+    "string": lambda name, t, ctype: _sized_call("readString", name, t),
+}
+
+
+def _emit_scalar(
+    emitters: dict[str, _Emitter], t: ProtoType, name: str, registry: dict[str, tuple[str, str]]
+) -> str:
+    kind = registry.get(t.name)
+    if kind is None:
+        raise RuntimeError(f"Unknown type {t.name}")
+    tag, underlying_type = kind
+    return emitters[tag](name, t, underlying_type)
+
+
+def _write_type(
+    t: ProtoType, name: str, array_size: int | None, registry: dict[str, tuple[str, str]]
+) -> str:
+    if array_size is not None:
+        size_arg = f", {array_size}" if array_size > 0 else ""
+        element = _emit_scalar(_WRITERS, t, "val", registry)
+        return _ARRAY_WRITE.format_map({"name": name, "size_arg": size_arg, "element": element})
+    return _emit_scalar(_WRITERS, t, name, registry)
+
+
+def _read_type(
+    t: ProtoType, name: str, array_size: int | None, registry: dict[str, tuple[str, str]]
+) -> str:
+    if array_size is not None:
+        size_arg = f", {array_size}" if array_size > 0 else ""
+        element = _emit_scalar(_READERS, t, "val", registry)
+        return _ARRAY_READ.format_map({"name": name, "size_arg": size_arg, "element": element})
+    return _emit_scalar(_READERS, t, name, registry)
+
+
+def _fingerprint(
+    enums: list[ProtoEnum],
+    structs: list[ProtoStruct],
+    proto: Protocol | None,
+    comments: list[str],
+) -> str:
+    return hashlib.blake2b(repr((enums, structs, proto, comments)).encode("utf-8")).hexdigest()
+
+
 def render(
     enums: list[ProtoEnum],
     structs: list[ProtoStruct],
     proto: Protocol | None,
     comments: list[str],
 ) -> str:
-    """Render a protocol definition to C++ source code."""
-    enums_types = {enum.name: enum for enum in enums}
-    structs_types = {struct.name: struct for struct in structs}
-
-    def _write_type(member: ProtoStructMember) -> str:
-        if member.array_size is not None:
-            size_arg = f", {member.array_size}" if member.array_size > 0 else ""
-            tmp_member = copy(member)
-            tmp_member.array_size = None
-            tmp_member.name = "val"
-            return f"""writeArray(stream, {member.name}{size_arg}, [](T &stream, const auto &val) {{
-      return {_write_type(tmp_member)}
-    }});"""
-        if member.type.name in enums_types:
-            underlying_type = _map_type(enums_types[member.type.name].type)
-            return f"write(stream, ({underlying_type}){member.name});"
-        if member.type.name in structs_types:
-            return f"{member.name}.pack(stream);"
-        if member.type.name in PRIMITIVE_TYPE_MAP and member.type.name not in {"bytes", "string"}:
-            return f"write(stream, {member.name});"
-        if member.type.name == "bytes":
-            if member.type.size:
-                return f"writeBytes(stream, {member.name}, {member.type.size});"
-            return f"writeBytes(stream, {member.name});"
-        if member.type.name == "string":
-            if member.type.size:
-                return f"writeString(stream, {member.name}, {member.type.size});"
-            return f"writeString(stream, {member.name});"
-        raise RuntimeError(f"Unknown type {member.type.name}")
-
-    def _read_type(member: ProtoStructMember) -> str:
-        if member.array_size is not None:
-            size_arg = f", {member.array_size}" if member.array_size > 0 else ""
-            tmp_member = copy(member)
-            tmp_member.array_size = None
-            tmp_member.name = "val"
-            return f"""readArray(stream, {member.name}{size_arg}, [](T &stream, auto &val) {{
-      return {_read_type(tmp_member)}
-    }});"""
-        if member.type.name in enums_types:
-            underlying_type = _map_type(enums_types[member.type.name].type)
-            return f"read(stream, ({underlying_type}&){member.name});"
-        if member.type.name in structs_types:
-            return f"{member.name}.unpack(stream);"
-        if member.type.name in PRIMITIVE_TYPE_MAP and member.type.name not in {"bytes", "string"}:
-            return f"read(stream, {member.name});"
-        if member.type.name == "bytes":
-            if member.type.size:
-                return f"readBytes(stream, {member.name}, {member.type.size});"
-            return f"readBytes(stream, {member.name});"
-        if member.type.name == "string":
-            if member.type.size:
-                return f"readString(stream, {member.name}, {member.type.size});"
-            return f"readString(stream, {member.name});"
-        raise RuntimeError(f"Unknown type {member.type.name}")
+    """Render a protocol definition to C++ source code.
+
+    Results are memoized, so rendering an identical definition again is a lookup.
+    """
+    key = _fingerprint(enums, structs, proto, comments)
+    cached = _render_cache.get(key)
+    if cached is not None:
+        return cached
+
+    generated = _template().render(**_render_context(enums, structs, proto, comments))
+
+    if len(_render_cache) >= _RENDER_CACHE_SIZE:
+        del _render_cache[next(iter(_render_cache))]
+    _render_cache[key] = generated
+    return generated
+
+
+# Template helpers that don't depend on the protocol being rendered
+_STATIC_CONTEXT: dict[str, Any] = {
+    "map_type": _map_type,
+    "map_type_member": _map_type_member,
+    "array_postfix": _array_postfix,
+    "size_postfix": _size_postfix,
+}
+
+
+def _render_context(
+    enums: list[ProtoEnum],
+    structs: list[ProtoStruct],
+    proto: Protocol | None,
+    comments: list[str],
+) -> dict[str, Any]:
+    registry = _type_registry(enums, structs)
+
+    # Members with the same (type, size, array size) shape produce the same code
+    # apart from their name, so generate it once and substitute the name.
+    write_cache: dict[_MemberShape, str] = {}
+    read_cache: dict[_MemberShape, str] = {}
+
+    def _memoized(
+        emit: Callable[[ProtoType, str, int | None], str], cache: dict[_MemberShape, str]
+    ) -> Callable[[ProtoStructMember], str]:
+        def lookup(member: ProtoStructMember) -> str:
+            key = (member.type.name, member.type.size, member.array_size)
+            code = cache.get(key)
+            if code is None:
+                code = cache[key] = emit(member.type, _NAME_PLACEHOLDER, member.array_size)
+            return code.replace(_NAME_PLACEHOLDER, member.name)
+
+        return lookup
 
     message_ids: list[tuple[str, int]] = []
     framer = ""
 
     if proto is not None:
-        message_ids = [(msg.name, msg.number) for msg in proto.message_ids]
-        options = {option.name: option.value for option in proto.options}
+        message_ids = proto.message_id_pairs
+        options = proto.options_map
         crc = options.get("crc", "none").lower()
         framing = options.get("framing", "").lower()
         max_length = options.get("maxLength")
@@ -153,54 +280,42 @@ def render(
         if max_length is None:
             raise RuntimeError("maxLength must be specified")
 
-        if crc == "none":
-            crc_type = "CrcNoop"
-            crc_size = 0
-        elif crc == "crc8":
-            crc_type = "Crc8"
-            crc_size = 1
-        elif crc == "crc16":
-            crc_type = "Crc16"
-            crc_size = 2
-        elif crc == "crc32":
-            crc_type = "Crc32"
-            crc_size = 4
-        else:
-            raise RuntimeError(f"Unknown CRC type {crc}")
+        try:
+            crc_type, crc_size = _CRC_TABLE[crc]
+        except KeyError:
+            raise RuntimeError(f"Unknown CRC type {crc}") from None
 
         max_length = int(max_length)
         max_length += overhead(int(max_length), crc_size)
 
-        if framing == "cobs":
-            framer = f"Bakelite::CobsFramer<Bakelite::{crc_type}, {max_length}>"
-        else:
-            raise RuntimeError(f"Unknown framing type {framing}")
-
-    return template.render(
-        enums=enums,
-        structs=structs,
-        proto=proto,
-        comments=comments,
-        map_type=_map_type,
-        map_type_member=_map_type_member,
-        array_postfix=_array_postfix,
-        size_postfix=_size_postfix,
-        write_type=_write_type,
-        read_type=_read_type,
-        framer=framer,
-        message_ids=message_ids,
-    )
+        try:
+            framer_type = _FRAMING_TABLE[framing]
+        except KeyError:
+            raise RuntimeError(f"Unknown framing type {framing}") from None
+        framer = f"Bakelite::{framer_type}<Bakelite::{crc_type}, {max_length}>"
 
+    return {
+        **_STATIC_CONTEXT,
+        "enums": enums,
+        "structs": structs,
+        "proto": proto,
+        "comments": comments,
+        "write_type": _memoized(functools.partial(_write_type, registry=registry), write_cache),
+        "read_type": _memoized(functools.partial(_read_type, registry=registry), read_cache),
+        "framer": framer,
+        "message_ids": message_ids,
+    }
 
-def runtime() -> str:
-    """Generate the C++ runtime support code."""
 
-    def include(filename: str) -> str:
-        with open(
-            os.path.join(os.path.dirname(__file__), "runtimes", "cpptiny", filename),
-            encoding="utf-8",
-        ) as f:
-            return f.read()
+_RUNTIMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtimes", "cpptiny")
+
 
-    runtime_template = env.get_template("cpptiny-bakelite.h.j2")
-    return runtime_template.render(include=include)
+@functools.cache
+def _include(filename: str) -> str:
+    with open(os.path.join(_RUNTIMES_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def runtime() -> str:
+    """Generate the C++ runtime support code."""
+    return _runtime_template().render(include=_include)
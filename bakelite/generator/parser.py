@@ -1,10 +1,11 @@
 """Protocol definition parser using Lark."""
 
-import os
+import functools
 from dataclasses import dataclass
+from importlib import resources
 from typing import Any, TypeVar
 
-from lark import Lark
+from lark import Lark, Token, v_args
 from lark.visitors import Transformer
 
 from .types import (
@@ -20,76 +21,59 @@ from .types import (
     ProtoType,
 )
 
-_g_parser: Lark | None = None
-
 
 class ValidationError(RuntimeError):
     """Raised when protocol validation fails."""
 
 
-@dataclass
-class _Array:
-    value: int
-
-
-@dataclass
-class _Comment:
-    value: str
-
-
-@dataclass
-class _Name:
-    value: str
-
-
-@dataclass
-class _Value:
-    value: str
-
-
-@dataclass
-class _Number:
-    value: int
-
-
-@dataclass
+@dataclass(slots=True)
 class _ProtoMessageIds:
     ids: list[ProtoMessageId]
 
 
-TFilter = TypeVar("TFilter", bound=object)
+def _bucket(args: list[Any]) -> dict[Any, list[Any]]:
+    """Group transformed children by token type or concrete class in a single pass."""
+    buckets: dict[Any, list[Any]] = {}
+    for v in args:
+        key = v.type if isinstance(v, Token) else type(v)
+        buckets.setdefault(key, []).append(v)
+    return buckets
 
 
-def _filter(args: list[Any], class_type: type[TFilter]) -> list[TFilter]:
-    return [v for v in args if isinstance(v, class_type)]
-
-
-def _find_one(args: list[Any], class_type: type[object]) -> Any:
-    filtered = _filter(args, class_type)
-    if len(filtered) == 0:
+def _one(buckets: dict[Any, list[Any]], key: Any) -> Any:
+    found = buckets.get(key)
+    if not found:
         return None
-    if len(filtered) > 1:
-        raise RuntimeError(f"Found more than one {class_type}")
+    if len(found) > 1:
+        raise RuntimeError(f"Found more than one {key}")
 
-    if hasattr(filtered[0], "value"):
-        return filtered[0].value
-    return filtered[0]
+    if hasattr(found[0], "value"):
+        return found[0].value
+    return found[0]
 
 
 TMany = TypeVar("TMany")
 
 
-def _find_many(args: list[Any], class_type: type[TMany]) -> list[TMany]:
-    return _filter(args, class_type)
+def _many(buckets: dict[Any, list[Any]], key: type[TMany]) -> list[TMany]:
+    return buckets.get(key, [])
 
 
 class TreeTransformer(Transformer):
     """Transform parse tree into protocol types."""
 
-    def array(self, args: list[Any]) -> _Array:
-        if len(args) > 0:
-            return _Array(value=int(args[0]))
-        return _Array(value=0)
+    # Terminal callbacks: leave the token type in place for _bucket and
+    # convert the value to what the protocol types expect
+
+    def ARRAY_SIZE(self, token: Token) -> Token:
+        size = token[1:-1].strip()
+        return token.update(value=int(size) if size else 0)
+
+    def COMMENT(self, token: Token) -> Token:
+        return token.update(value=token[1:])
+
+    def NUMBER(self, token: Token) -> Token:
+        return token.update(value=int(token))
 
     def argument_val(self, args: list[Any]) -> ProtoAnnotationArg:
         if len(args) == 1:
@@ -99,96 +83,96 @@ class TreeTransformer(Transformer):
         raise RuntimeError("Argument has more than three args")
 
     def annotation(self, args: list[Any]) -> ProtoAnnotation:
-        return ProtoAnnotation(name=str(args[0]), arguments=_find_many(args, ProtoAnnotationArg))
-
-    def comment(self, args: list[Any]) -> _Comment:
-        return _Comment(value=str(args[0]))
+        by_type = _bucket(args)
+        return ProtoAnnotation(name=str(args[0]), arguments=_many(by_type, ProtoAnnotationArg))
 
     def enum(self, args: list[Any]) -> ProtoEnum:
+        by_type = _bucket(args)
         return ProtoEnum(
-            type=_find_one(args, ProtoType),
-            name=_find_one(args, _Name),
-            values=_find_many(args, ProtoEnumValue),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            type=_one(by_type, ProtoType),
+            name=_one(by_type, "NAME"),
+            values=_many(by_type, ProtoEnumValue),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
     def enum_value(self, args: list[Any]) -> ProtoEnumValue:
+        by_type = _bucket(args)
         return ProtoEnumValue(
-            name=_find_one(args, _Name),
-            value=_find_one(args, _Value),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            name=_one(by_type, "NAME"),
+            value=_one(by_type, "LITERAL"),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
-    def name(self, args: list[Any]) -> _Name:
-        return _Name(value=str(args[0]))
-
-    def number(self, args: list[Any]) -> _Number:
-        return _Number(value=int(args[0]))
+    @v_args(inline=True)
+    def prim(self, type_name: Token) -> ProtoType:
+        return ProtoType(name=str(type_name), size=0)
 
-    def prim(self, args: list[Any]) -> ProtoType:
-        return ProtoType(name=str(args[0]), size=0)
-
-    def prim_variable(self, args: list[Any]) -> ProtoType:
-        if len(args) > 1 and args[1] is not None:
-            return ProtoType(name=str(args[0]), size=int(args[1]))
-        return ProtoType(name=str(args[0]), size=None)
+    @v_args(inline=True)
+    def prim_variable(self, type_name: Token, size: Token | None) -> ProtoType:
+        if size is not None:
+            return ProtoType(name=str(type_name), size=int(size))
+        return ProtoType(name=str(type_name), size=None)
 
     def proto(self, args: list[Any]) -> Protocol:
-        ids = _find_one(args, _ProtoMessageIds)
+        by_type = _bucket(args)
+        ids = _one(by_type, _ProtoMessageIds)
 
         return Protocol(
-            options=_find_many(args, ProtoOption),
+            options=_many(by_type, ProtoOption),
             message_ids=ids.ids if ids else [],
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
     def proto_message_id(self, args: list[Any]) -> ProtoMessageId:
+        by_type = _bucket(args)
         return ProtoMessageId(
-            name=_find_one(args, _Name),
-            number=_find_one(args, _Number),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            name=_one(by_type, "NAME"),
+            number=_one(by_type, "NUMBER"),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
     def proto_message_ids(self, args: list[Any]) -> _ProtoMessageIds:
-        return _ProtoMessageIds(ids=_find_many(args, ProtoMessageId))
+        by_type = _bucket(args)
+        return _ProtoMessageIds(ids=_many(by_type, ProtoMessageId))
 
     def proto_member(self, args: list[Any]) -> ProtoOption:
+        by_type = _bucket(args)
         return ProtoOption(
-            name=_find_one(args, _Name),
-            value=_find_one(args, _Value),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            name=_one(by_type, "NAME"),
+            value=_one(by_type, "LITERAL"),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
     def struct(self, args: list[Any]) -> ProtoStruct:
+        by_type = _bucket(args)
         return ProtoStruct(
-            name=_find_one(args, _Name),
-            members=_find_many(args, ProtoStructMember),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
+            name=_one(by_type, "NAME"),
+            members=_many(by_type, ProtoStructMember),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
         )
 
     def struct_member(self, args: list[Any]) -> ProtoStructMember:
+        by_type = _bucket(args)
         return ProtoStructMember(
-            name=_find_one(args, _Name),
-            type=_find_one(args, ProtoType),
-            value=_find_one(args, _Value),
-            comment=_find_one(args, _Comment),
-            annotations=_find_many(args, ProtoAnnotation),
-            array_size=_find_one(args, _Array),
+            name=_one(by_type, "NAME"),
+            type=_one(by_type, ProtoType),
+            value=_one(by_type, "LITERAL"),
+            comment=_one(by_type, "COMMENT"),
+            annotations=_many(by_type, ProtoAnnotation),
+            array_size=_one(by_type, "ARRAY_SIZE"),
         )
 
-    def value(self, args: list[Any]) -> _Value:
-        return _Value(value=str(args[0]))
-
-    def type(self, args: list[Any]) -> ProtoType:
-        if isinstance(args[0], ProtoType):
-            return args[0]
-        return ProtoType(name=str(args[0]), size=None)
+    @v_args(inline=True)
+    def type(self, type_: ProtoType | Token) -> ProtoType:
+        if isinstance(type_, ProtoType):
+            return type_
+        return ProtoType(name=str(type_), size=None)
 
 
 def validate(
@@ -198,43 +182,49 @@ def validate(
     _comments: list[str],
 ) -> None:
     """Validate parsed protocol definition."""
-    _enum_map = {enum.name: enum for enum in enums}
-    struct_map = {struct.name: struct for struct in structs}
-
     if not protocol:
         return
 
+    struct_names = frozenset(struct.name for struct in structs)
+
     # Validate Message IDs
     for msg_id in protocol.message_ids:
         if msg_id.number == 0:
             raise ValidationError("Message ID 0 is reserved for future use")
-        if msg_id.name not in struct_map:
+        if msg_id.number > 255:
+            raise ValidationError(
+                f"Message ID {msg_id.number} for {msg_id.name} does not fit in one byte"
+            )
+        if msg_id.name not in struct_names:
             raise ValidationError(f"{msg_id.name} assigned a message ID, but not declared")
 
 
+# cache=True stores the built tables in the temp dir, keyed on a hash of the
+# grammar and options, so later processes skip grammar analysis. Passing the
+# transformer builds protocol types during reduction instead of a second pass.
+@functools.cache
+def _parser() -> Lark:
+    # Built on first use so commands that never parse don't pay for it
+    return Lark(
+        resources.files("bakelite.generator").joinpath("protodef.lark").read_text(encoding="utf-8"),
+        parser="lalr",
+        lexer="contextual",
+        cache=True,
+        transformer=TreeTransformer(),
+    )
+
+
 def parse(
     text: str,
 ) -> tuple[list[ProtoEnum], list[ProtoStruct], Protocol | None, list[str]]:
     """Parse a protocol definition file."""
-    global _g_parser
-
-    if not _g_parser:
-        with open(f"{os.path.dirname(__file__)}/protodef.lark", encoding="utf-8") as f:
-            grammar = f.read()
-
-        # Note: cache=True requires parser="lalr" which doesn't work with the
-        # current grammar due to ambiguities. Grammar refactoring would be needed.
-        _g_parser = Lark(grammar)
-
-    tree = _g_parser.parse(text)
-    tree = TreeTransformer().transform(tree)
-
-    items = next(iter(tree.iter_subtrees_topdown())).children
+    tree = _parser().parse(text)
 
-    enums = _find_many(items, ProtoEnum)
-    structs = _find_many(items, ProtoStruct)
-    protocol = _find_one(items, Protocol)
-    comments = [comment.value for comment in _find_many(items, _Comment)]
+    by_type = _bucket(tree.children)
+    enums = _many(by_type, ProtoEnum)
+    structs = _many(by_type, ProtoStruct)
+    protocol = _one(by_type, Protocol)
+    comments = [comment.value for comment in by_type.get("COMMENT", [])]
 
     validate(enums, structs, protocol, comments)
 
@@ -1,12 +1,17 @@
 """Python code generator for bakelite protocols."""
 
+import functools
+from dataclasses import replace
 from importlib import resources
+from typing import TYPE_CHECKING
 
-from jinja2 import Environment, PackageLoader
-
+from ._env import env
 from .types import Protocol, ProtoEnum, ProtoStruct, ProtoStructMember, ProtoType
 from .util import to_camel_case
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
 RUNTIME_FILES = [
     "__init__.py",
     "types.py",
@@ -16,16 +21,11 @@ RUNTIME_FILES = [
     "crc.py",
 ]
 
-env = Environment(
-    loader=PackageLoader("bakelite.generator", "templates"),
-    trim_blocks=True,
-    lstrip_blocks=True,
-    keep_trailing_newline=True,
-    line_comment_prefix="%%",
-    line_statement_prefix="%",
-)
 
-template = env.get_template("python.py.j2")
+@functools.cache
+def _template() -> "Template":
+    return env().get_template("python.py.j2", globals=_TEMPLATE_GLOBALS)
+
 
 # Map bakelite types to Python type annotations
 PRIMITIVE_TYPE_MAP = {
@@ -76,14 +76,24 @@ TYPE_SIZES = {
 
 PRIMITIVES = frozenset(PRIMITIVE_TYPE_MAP.keys())
 
+# (format character, size) for each numeric type, so codegen resolves both in one lookup
+TYPE_INFO: dict[str, tuple[str, int]] = {
+    name: (fmt, TYPE_SIZES[name]) for name, fmt in FORMAT_CHARS.items()
+}
+
 
 def _map_type(member: ProtoStructMember) -> str:
     """Map a proto type to a Python type annotation."""
-    type_name = PRIMITIVE_TYPE_MAP.get(member.type.name, member.type.name)
+    return _annotation_for(member.type.name, member.array_size is not None)
 
-    if member.array_size is not None:
-        return f"list[{type_name}]"
-    return type_name
+
+@functools.cache
+def _annotation_for(type_name: str, is_array: bool) -> str:
+    annotation = PRIMITIVE_TYPE_MAP.get(type_name, type_name)
+
+    if is_array:
+        return f"list[{annotation}]"
+    return annotation
 
 
 def _is_primitive(t: ProtoType) -> bool:
@@ -111,8 +121,9 @@ def _gen_pack_primitive(member: ProtoStructMember, indent: str = "") -> str:
     t = member.type
     name = member.name
 
-    if t.name in FORMAT_CHARS:
-        fmt = FORMAT_CHARS[t.name]
+    info = TYPE_INFO.get(t.name)
+    if info is not None:
+        fmt, _ = info
         return f'{indent}_buf.extend(_struct.pack("={fmt}", self.{name}))'
 
     if t.name == "bytes":
@@ -157,9 +168,9 @@ def _gen_unpack_primitive(member: ProtoStructMember, indent: str = "") -> str:
     t = member.type
     name = member.name
 
-    if t.name in FORMAT_CHARS:
-        fmt = FORMAT_CHARS[t.name]
-        size = TYPE_SIZES[t.name]
+    info = TYPE_INFO.get(t.name)
+    if info is not None:
+        fmt, size = info
         return (
             f'{indent}{name} = _struct.unpack_from("={fmt}", _data, _o)[0]\n'
             f"{indent}_o += {size}"
@@ -181,7 +192,12 @@ def _gen_unpack_primitive(member: ProtoStructMember, indent: str = "") -> str:
         if t.size is None or t.size == 0:
             # Variable length string (null terminated)
             return (
-                f'{indent}_end_{name} = _data.find(b"\\x00", _o)\n'
+                f"{indent}if isinstance(_data, memoryview):\n"
+                f"{indent}    # memoryview has no find(); search a copy of the remaining window\n"
+                f'{indent}    _end_{name} = bytes(_data[_o:]).find(b"\\x00")\n'
+                f"{indent}    _end_{name} = _end_{name} + _o if _end_{name} >= 0 else -1\n"
+                f"{indent}else:\n"
+                f'{indent}    _end_{name} = _data.find(b"\\x00", _o)\n'
                 f"{indent}if _end_{name} < 0:\n"
                 f'{indent}    raise SerializationError("unterminated string {name}")\n'
                 f'{indent}{name} = bytes(_data[_o:_end_{name}]).decode("ascii")\n'
@@ -189,9 +205,9 @@ def _gen_unpack_primitive(member: ProtoStructMember, indent: str = "") -> str:
             )
         # Fixed length string
         return (
-            f"{indent}_raw_{name} = _data[_o:_o + {t.size}]\n"
+            f"{indent}_raw_{name} = bytes(_data[_o:_o + {t.size}])\n"
             f'{indent}_null_{name} = _raw_{name}.find(b"\\x00")\n'
-            f'{indent}{name} = bytes(_raw_{name}[:_null_{name} if _null_{name} >= 0 else {t.size}]).decode("ascii")\n'
+            f'{indent}{name} = _raw_{name}[:_null_{name} if _null_{name} >= 0 else {t.size}].decode("ascii")\n'
             f"{indent}_o += {t.size}"
         )
 
@@ -199,7 +215,7 @@ def _gen_unpack_primitive(member: ProtoStructMember, indent: str = "") -> str:
 
 
 def _gen_pack_field(
-    member: ProtoStructMember, enums: list[ProtoEnum], structs: list[ProtoStruct]
+    member: ProtoStructMember, enum_names: frozenset[str], struct_names: frozenset[str]
 ) -> str:
     """Generate pack code for a struct field."""
     t = member.type
@@ -215,8 +231,9 @@ def _gen_pack_field(
             lines.append(f'_buf.extend(_struct.pack("=B", len(self.{name})))')
 
         # Check if it's a primitive array that can be batched
-        if t.name in FORMAT_CHARS:
-            fmt = FORMAT_CHARS[t.name]
+        info = TYPE_INFO.get(t.name)
+        if info is not None:
+            fmt, _ = info
             if member.array_size == 0:
                 # Variable length - use f-string format
                 lines.append(
@@ -236,14 +253,7 @@ def _gen_pack_field(
             lines.append(f"for _item in self.{name}:")
             if _is_primitive(t):
                 inner = _gen_pack_primitive(
-                    ProtoStructMember(
-                        type=t,
-                        name="_item",
-                        value=None,
-                        comment=None,
-                        annotations=[],
-                        array_size=None,
-                    ),
+                    replace(member, name="_item", array_size=None),
                     indent="",
                 )
                 # Replace self._item with _item
@@ -251,7 +261,7 @@ def _gen_pack_field(
                 # Indent each line properly
                 for line in inner.split("\n"):
                     lines.append("    " + line)
-            elif _is_enum(t, enums):
+            elif _is_enum(t, enum_names):
                 lines.append("    _buf.extend(_item.pack())")
             else:
                 lines.append("    _buf.extend(_item.pack())")
@@ -260,14 +270,14 @@ def _gen_pack_field(
     # Single value
     if _is_primitive(t):
         return _gen_pack_primitive(member)
-    if _is_enum(t, enums):
+    if _is_enum(t, enum_names):
         return f"_buf.extend(self.{name}.pack())"
     # Nested struct
     return f"_buf.extend(self.{name}.pack())"
 
 
 def _gen_unpack_field(
-    member: ProtoStructMember, enums: list[ProtoEnum], structs: list[ProtoStruct]
+    member: ProtoStructMember, enum_names: frozenset[str], struct_names: frozenset[str]
 ) -> str:
     """Generate unpack code for a struct field."""
     t = member.type
@@ -282,9 +292,9 @@ def _gen_unpack_field(
             lines.append("_o += 1")
 
         # Check if it's a primitive array that can be batched
-        if t.name in FORMAT_CHARS:
-            fmt = FORMAT_CHARS[t.name]
-            size = TYPE_SIZES[t.name]
+        info = TYPE_INFO.get(t.name)
+        if info is not None:
+            fmt, size = info
             if member.array_size == 0:
                 # Variable length
                 lines.append(
@@ -305,21 +315,14 @@ def _gen_unpack_field(
             if _is_primitive(t):
                 # For primitive non-numeric types (bytes/string in arrays is unusual)
                 inner = _gen_unpack_primitive(
-                    ProtoStructMember(
-                        type=t,
-                        name="_item",
-                        value=None,
-                        comment=None,
-                        annotations=[],
-                        array_size=None,
-                    ),
+                    replace(member, name="_item", array_size=None),
                     indent="",
                 )
                 # Indent each line properly
                 for line in inner.split("\n"):
                     lines.append("    " + line)
                 lines.append(f"    {name}.append(_item)")
-            elif _is_enum(t, enums):
+            elif _is_enum(t, enum_names):
                 lines.append(f"    _item, _n = {t.name}.unpack(_data, _o)")
                 lines.append("    _o += _n")
                 lines.append(f"    {name}.append(_item)")
@@ -332,35 +335,55 @@ def _gen_unpack_field(
     # Single value
     if _is_primitive(t):
         return _gen_unpack_primitive(member)
-    if _is_enum(t, enums):
+    if _is_enum(t, enum_names):
         return f"{name}, _n = {t.name}.unpack(_data, _o)\n_o += _n"
     # Nested struct
     return f"{name}, _n = {t.name}.unpack(_data, _o)\n_o += _n"
 
 
-def _is_enum(t: ProtoType, enums: list[ProtoEnum]) -> bool:
+def _is_enum(t: ProtoType, enum_names: frozenset[str]) -> bool:
     """Check if a type is an enum."""
-    return any(e.name == t.name for e in enums)
+    return t.name in enum_names
 
 
-def _is_struct(t: ProtoType, structs: list[ProtoStruct]) -> bool:
+def _is_struct(t: ProtoType, struct_names: frozenset[str]) -> bool:
     """Check if a type is a struct."""
-    return any(s.name == t.name for s in structs)
+    return t.name in struct_names
 
 
-def _can_batch(member: ProtoStructMember, enums: list[ProtoEnum]) -> bool:
+def _can_batch(member: ProtoStructMember, enum_names: frozenset[str]) -> bool:
     """Check if member can be batched with other primitives."""
     if member.array_size is not None:
+        # Fixed length numeric arrays pack as a repeated format code
+        return member.array_size > 0 and member.type.name in FORMAT_CHARS
+    if member.type.name == "bytes":
+        # Fixed length bytes pack as a zero-padded "Ns" field
+        return bool(member.type.size)
+    if member.type.name == "string":
         return False
-    if member.type.name in ("bytes", "string"):
-        return False
-    if _is_enum(member.type, enums):
+    if _is_enum(member.type, enum_names):
         return False
     return member.type.name in FORMAT_CHARS
 
 
+def _batch_format(member: ProtoStructMember) -> str:
+    """Get the struct format code for a batchable member."""
+    if member.type.name == "bytes":
+        return f"{member.type.size}s"
+    if member.array_size:
+        return f"{member.array_size}{FORMAT_CHARS[member.type.name]}"
+    return FORMAT_CHARS[member.type.name]
+
+
+def _batch_size(member: ProtoStructMember) -> int:
+    """Get the packed size of a batchable member."""
+    if member.type.name == "bytes":
+        return member.type.size or 0
+    return TYPE_SIZES[member.type.name] * (member.array_size or 1)
+
+
 def _batch_members(
-    members: list[ProtoStructMember], enums: list[ProtoEnum]
+    members: list[ProtoStructMember], enum_names: frozenset[str]
 ) -> list[tuple[str, list[ProtoStructMember]]]:
     """Group members into batches for pack/unpack optimization.
 
@@ -370,7 +393,7 @@ def _batch_members(
     current: list[ProtoStructMember] = []
 
     for member in members:
-        if _can_batch(member, enums):
+        if _can_batch(member, enum_names):
             current.append(member)
         else:
             if current:
@@ -384,22 +407,59 @@ def _batch_members(
     return batches
 
 
-def _gen_pack_batch(members: list[ProtoStructMember]) -> str:
-    """Generate pack code for a batch of primitives."""
-    fmt = "=" + "".join(FORMAT_CHARS[m.type.name] for m in members)
-    args = ", ".join(f"self.{m.name}" for m in members)
-    return f'_buf.extend(_struct.pack("{fmt}", {args}))'
+def _batch_struct_format(members: list[ProtoStructMember]) -> str:
+    """Get the struct format string for a batch of primitives."""
+    return "=" + "".join(_batch_format(m) for m in members)
 
 
-def _gen_unpack_batch(members: list[ProtoStructMember]) -> str:
-    """Generate unpack code for a batch of primitives."""
-    fmt = "=" + "".join(FORMAT_CHARS[m.type.name] for m in members)
-    size = sum(TYPE_SIZES[m.type.name] for m in members)
+def _gen_pack_batch(
+    members: list[ProtoStructMember], struct_name: str, direct: bool = False
+) -> str:
+    """Generate pack code for a batch of primitives using a precompiled struct.
+
+    With direct=True the batch is the whole struct, so the packed bytes are
+    returned as-is instead of being copied through a bytearray.
+    """
+    lines: list[str] = []
+    for m in members:
+        # struct.pack silently truncates "Ns" fields, so check lengths first
+        if m.type.name == "bytes":
+            lines.append(f"if len(self.{m.name}) > {m.type.size}:")
+            lines.append(f'    raise SerializationError("{m.name} exceeds {m.type.size} bytes")')
+        elif m.array_size:
+            lines.append(f"if len(self.{m.name}) != {m.array_size}:")
+            lines.append(
+                f'    raise SerializationError("{m.name} must have {m.array_size} elements")'
+            )
+    args = ", ".join(f"*self.{m.name}" if m.array_size else f"self.{m.name}" for m in members)
+    if direct:
+        lines.append(f"return self.{struct_name}.pack({args})")
+    else:
+        lines.append(f"_buf.extend(self.{struct_name}.pack({args}))")
+    return "\n".join(lines)
+
+
+def _gen_unpack_batch(members: list[ProtoStructMember], struct_name: str) -> str:
+    """Generate unpack code for a batch of primitives using a precompiled struct."""
+    size = sum(_batch_size(m) for m in members)
+    if any(m.array_size for m in members):
+        # Arrays come back flattened into the tuple, so slice them back out
+        lines = [f"_v = cls.{struct_name}.unpack_from(_data, _o)"]
+        pos = 0
+        for m in members:
+            if m.array_size:
+                lines.append(f"{m.name} = list(_v[{pos}:{pos + m.array_size}])")
+                pos += m.array_size
+            else:
+                lines.append(f"{m.name} = _v[{pos}]")
+                pos += 1
+        lines.append(f"_o += {size}")
+        return "\n".join(lines)
     names = ", ".join(m.name for m in members)
     # Add trailing comma for single values so tuple unpacking works: val, = (1,)
     if len(members) == 1:
         names += ","
-    return f'{names} = _struct.unpack_from("{fmt}", _data, _o)\n_o += {size}'
+    return f"{names} = cls.{struct_name}.unpack_from(_data, _o)\n_o += {size}"
 
 
 def _field_args(member: ProtoStructMember) -> str:
@@ -414,6 +474,24 @@ def _field_args(member: ProtoStructMember) -> str:
     return ""
 
 
+# Helpers exposed to python.py.j2; anything protocol-specific is passed in by the template
+_TEMPLATE_GLOBALS = {
+    "map_type": _map_type,
+    "is_primitive": _is_primitive,
+    "format_char": _format_char,
+    "type_size": _type_size,
+    "gen_pack_field": _gen_pack_field,
+    "gen_unpack_field": _gen_unpack_field,
+    "batch_members": _batch_members,
+    "batch_struct_format": _batch_struct_format,
+    "gen_pack_batch": _gen_pack_batch,
+    "gen_unpack_batch": _gen_unpack_batch,
+    "field_args": _field_args,
+    "to_camel_case": to_camel_case,
+    "BLANK_LINE": "",
+}
+
+
 def render(
     enums: list[ProtoEnum],
     structs: list[ProtoStruct],
@@ -422,29 +500,25 @@ def render(
     runtime_import: str = "bakelite_runtime",
 ) -> str:
     """Render a protocol definition to Python source code."""
-    return template.render(
+    return _template().render(
         enums=enums,
         structs=structs,
         proto=proto,
         comments=comments,
-        map_type=_map_type,
-        is_primitive=_is_primitive,
-        format_char=_format_char,
-        type_size=_type_size,
-        gen_pack_field=lambda m: _gen_pack_field(m, enums, structs),
-        gen_unpack_field=lambda m: _gen_unpack_field(m, enums, structs),
-        batch_members=lambda members: _batch_members(members, enums),
-        gen_pack_batch=_gen_pack_batch,
-        gen_unpack_batch=_gen_unpack_batch,
-        field_args=_field_args,
-        to_camel_case=to_camel_case,
+        enum_names=frozenset(e.name for e in enums),
+        struct_names=frozenset(s.name for s in structs),
         runtime_import=runtime_import,
-        BLANK_LINE="",
     )
 
 
 def runtime() -> dict[str, str]:
     """Return the Python runtime files as a dict of filename -> content."""
+    # Copy so callers can't modify the cached contents
+    return dict(_runtime_files())
+
+
+@functools.cache
+def _runtime_files() -> dict[str, str]:
     result: dict[str, str] = {}
     for filename in RUNTIME_FILES:
         content = resources.files("bakelite.proto").joinpath(filename).read_text()
@@ -1,37 +1,36 @@
 """Type definitions for protocol parsing and code generation."""
 
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Any
 
-from dataclasses_json import DataClassJsonMixin
 
-
-@dataclass
-class ProtoType(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoType:
     """Represents a primitive or user-defined type."""
 
     name: str
     size: int | None
 
 
-@dataclass
-class ProtoAnnotationArg(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoAnnotationArg:
     """Represents an argument to an annotation."""
 
     name: str | None
     value: Any
 
 
-@dataclass
-class ProtoAnnotation(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoAnnotation:
     """Represents an annotation on a protocol element."""
 
     name: str
     arguments: list[ProtoAnnotationArg]
 
 
-@dataclass
-class ProtoEnumValue(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoEnumValue:
     """Represents a single enum value."""
 
     name: str
@@ -40,8 +39,8 @@ class ProtoEnumValue(DataClassJsonMixin):
     annotations: list[ProtoAnnotation]
 
 
-@dataclass
-class ProtoEnum(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoEnum:
     """Represents an enum type definition."""
 
     values: list[ProtoEnumValue]
@@ -51,8 +50,8 @@ class ProtoEnum(DataClassJsonMixin):
     annotations: list[ProtoAnnotation]
 
 
-@dataclass
-class ProtoStructMember(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoStructMember:
     """Represents a member of a struct."""
 
     type: ProtoType
@@ -63,8 +62,8 @@ class ProtoStructMember(DataClassJsonMixin):
     array_size: int | None
 
 
-@dataclass
-class ProtoStruct(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoStruct:
     """Represents a struct type definition."""
 
     members: list[ProtoStructMember]
@@ -73,8 +72,8 @@ class ProtoStruct(DataClassJsonMixin):
     annotations: list[ProtoAnnotation]
 
 
-@dataclass
-class ProtoOption(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoOption:
     """Represents a protocol option."""
 
     name: str
@@ -83,8 +82,8 @@ class ProtoOption(DataClassJsonMixin):
     annotations: list[ProtoAnnotation]
 
 
-@dataclass
-class ProtoMessageId(DataClassJsonMixin):
+@dataclass(slots=True)
+class ProtoMessageId:
     """Represents a message ID assignment."""
 
     name: str
@@ -94,7 +93,7 @@ class ProtoMessageId(DataClassJsonMixin):
 
 
 @dataclass
-class Protocol(DataClassJsonMixin):
+class Protocol:
     """Represents a complete protocol definition."""
 
     options: list[ProtoOption]
@@ -102,6 +101,16 @@ class Protocol(DataClassJsonMixin):
     comment: str | None
     annotations: list[ProtoAnnotation]
 
+    @cached_property
+    def options_map(self) -> dict[str, Any]:
+        """Option values keyed by option name."""
+        return {option.name: option.value for option in self.options}
+
+    @cached_property
+    def message_id_pairs(self) -> list[tuple[str, int]]:
+        """(message name, message id) for each entry of the message_ids block."""
+        return [(msg.name, msg.number) for msg in self.message_ids]
+
 
 PRIMITIVE_TYPES = frozenset(
     [
@@ -1,9 +1,16 @@
 """COBS framing and CRC support for bakelite protocols."""
 
+import struct
 from collections.abc import Callable
 
 from .crc import CrcSize, crc_funcs
 
+_CRC_STRUCTS = {
+    CrcSize.CRC8: struct.Struct("<B"),
+    CrcSize.CRC16: struct.Struct("<H"),
+    CrcSize.CRC32: struct.Struct("<I"),
+}
+
 
 class FrameError(RuntimeError):
     """Base exception for framing errors."""
@@ -21,33 +28,29 @@ class CRCCheckFailure(FrameError):
     """Raised when CRC validation fails."""
 
 
-def _append_block(block: bytearray, output: bytearray) -> None:
-    output.append(len(block) + 1)
-    output.extend(block)
-    block.clear()
-
-
 def encode(data: bytes) -> bytes:
     """Encode data using COBS (Consistent Overhead Byte Stuffing)."""
-    block = bytearray()
-    output = bytearray()
-    full_block = False
-
     if not data:
         return b""
 
-    for byte in data:
-        full_block = False
-        if byte == 0:
-            _append_block(block, output)
-        else:
-            block.append(byte)
-            if len(block) == 254:
-                _append_block(block, output)
-                full_block = True
-
-    if not full_block:
-        _append_block(block, output)
+    output = bytearray()
+    # Each zero-free run becomes one or more blocks; splitting and slicing keeps
+    # the per-byte work in C
+    runs = bytes(data).split(b"\x00")
+    last = len(runs) - 1
+
+    for i, run in enumerate(runs):
+        length = len(run)
+        start = 0
+        while length - start >= 254:
+            output.append(255)
+            output += run[start : start + 254]
+            start += 254
+
+        # A run that ends the data exactly on a full block needs no trailing block
+        if start < length or length == 0 or i != last:
+            output.append(length - start + 1)
+            output += run[start:]
 
     return bytes(output)
 
@@ -59,21 +62,22 @@ def decode(data: bytes) -> bytes:
     if not data:
         return b""
 
-    while len(data) > 0:
-        block_size = data[0]
+    pos = 0
+    size = len(data)
+    while pos < size:
+        block_size = data[pos]
 
         if block_size == 0:
             raise DecodeError("Unexpected null byte")
 
-        if block_size > len(data):
+        end = pos + block_size
+        if end > size:
             raise DecodeError("Block length exceeds size of available data")
 
-        block = data[1:block_size]
-        data = data[block_size:]
-
-        output.extend(block)
+        output += data[pos + 1 : end]
         if block_size != 255:
             output.append(0)
+        pos = end
 
     if output[-1] == 0:
         output.pop()
@@ -83,15 +87,15 @@ def decode(data: bytes) -> bytes:
 
 def append_crc(data: bytes, crc_size: CrcSize = CrcSize.CRC8) -> bytes:
     """Append a CRC checksum to data."""
-    return data + crc_funcs[crc_size](data).to_bytes(crc_size.value, byteorder="little")
+    return data + _CRC_STRUCTS[crc_size].pack(crc_funcs[crc_size](data))
 
 
 def check_crc(data: bytes, crc_size: CrcSize = CrcSize.CRC8) -> bytes:
     """Verify and strip CRC checksum from data."""
-    if not data:
+    if len(data) < crc_size.value:
         raise CRCCheckFailure()
 
-    crc_val = int.from_bytes(data[-crc_size.value :], byteorder="little")
+    (crc_val,) = _CRC_STRUCTS[crc_size].unpack_from(data, len(data) - crc_size.value)
     output = data[: -crc_size.value]
 
     if crc_funcs[crc_size](output) != crc_val:
@@ -117,28 +121,43 @@ class Framer:
 
     def encode_frame(self, data: bytes) -> bytes:
         """Encode a frame with framing and optional CRC."""
+        # One join copies the encoded body once; chained + would copy it twice
+        return b"".join(self.encode_frame_parts(data))
+
+    def encode_frame_parts(self, data: bytes) -> tuple[bytes, bytes, bytes]:
+        """Encode a frame as (start delimiter, body, end delimiter).
+
+        Writers that support scatter-gather output can send the parts without
+        joining them first.
+        """
         if not data:
             raise EncodeError("data must not be empty")
 
         if self._crc != CrcSize.NO_CRC:
             data = append_crc(data, crc_size=self._crc)
 
-        return b"\x00" + encode(data) + b"\x00"
+        return b"\x00", self._encode_fn(data), b"\x00"
 
     def decode_frame(self) -> bytes | None:
         """Attempt to decode a complete frame from the buffer."""
         while self._buffer:
-            byte = self._buffer.pop(0)
-
-            if byte == 0:
-                if self._frame:
-                    try:
-                        decoded = self._decode_frame_int(self._frame)
-                        return decoded
-                    finally:
-                        self._frame.clear()
-            else:
-                self._frame.append(byte)
+            end = self._buffer.find(0)
+
+            if end < 0:
+                # No delimiter yet; hold on to the partial frame
+                self._frame += self._buffer
+                self._buffer.clear()
+                break
+
+            self._frame += self._buffer[:end]
+            # Deleting from the front of a bytearray only moves its start offset
+            del self._buffer[: end + 1]
+
+            if self._frame:
+                try:
+                    return self._decode_frame_int(self._frame)
+                finally:
+                    self._frame.clear()
 
         return None
 
@@ -152,7 +171,7 @@ class Framer:
         self._buffer.extend(data)
 
     def _decode_frame_int(self, data: bytes) -> bytes:
-        data = decode(data)
+        data = self._decode_fn(data)
 
         if self._crc != CrcSize.NO_CRC:
             data = check_crc(data, crc_size=self._crc)
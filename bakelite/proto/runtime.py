@@ -1,7 +1,6 @@
 """Runtime support for bakelite protocol communication."""
 
 import asyncio
-import struct
 import time
 from asyncio import StreamReader, StreamWriter
 from collections.abc import AsyncIterator, Coroutine, Iterator
@@ -11,6 +10,15 @@ from typing import Any, ClassVar, Literal, overload
 from .framing import CrcSize, Framer
 from .serialization import Struct
 
+_ID_BYTES = [bytes((i,)) for i in range(256)]
+
+_CRC_SIZES = {
+    "none": CrcSize.NO_CRC,
+    "crc8": CrcSize.CRC8,
+    "crc16": CrcSize.CRC16,
+    "crc32": CrcSize.CRC32,
+}
+
 
 class ProtocolError(RuntimeError):
     """Raised when protocol operations fail."""
@@ -44,6 +52,8 @@ class ProtocolBase:
     _message_types: ClassVar[dict[int, type[Struct]]]
     _message_ids: ClassVar[dict[str, int]]
 
+    _types_by_id: list[type[Struct] | None]
+    _ids_by_type: dict[type[Struct], int]
     _stream: BufferedIOBase | None
     _async_reader: StreamReader | None
     _async_writer: StreamWriter | None
@@ -63,78 +73,125 @@ class ProtocolBase:
             self._async_reader = None
             self._async_writer = None
 
-        crc_size = CrcSize.NO_CRC
-        crc_lower = crc.lower()
-
-        if crc_lower == "none":
-            crc_size = CrcSize.NO_CRC
-        elif crc_lower == "crc8":
-            crc_size = CrcSize.CRC8
-        elif crc_lower == "crc16":
-            crc_size = CrcSize.CRC16
-        elif crc_lower == "crc32":
-            crc_size = CrcSize.CRC32
-        else:
-            raise ProtocolError(f"Unknown CRC type {crc}")
+        try:
+            crc_size = _CRC_SIZES[crc.lower()]
+        except KeyError:
+            raise ProtocolError(f"Unknown CRC type {crc}") from None
 
         if not framer:
             self._framer = Framer(crc=crc_size)
         else:
             self._framer = framer
 
-    def _encode_message(self, message: Struct) -> bytes:
-        """Encode a message to bytes (shared by sync and async)."""
-        msg_name = type(message).__name__
-        if msg_name not in self._message_ids:
-            raise ProtocolError(f"{type(message).__name__} has no message ID")
-        msg_id = self._message_ids[msg_name]
-
-        payload = struct.pack("=B", msg_id) + message.pack()
-        return self._framer.encode_frame(payload)
+        # Message ids are sent as a single byte, so once they are checked to fit,
+        # a 256 entry list covers every received id without a bounds check.
+        self._types_by_id = [None] * 256
+        for msg_id, msg_type in self._message_types.items():
+            if not 0 <= msg_id <= 255:
+                raise ProtocolError(
+                    f"Message ID {msg_id} for {msg_type.__name__} does not fit in one byte"
+                )
+            self._types_by_id[msg_id] = msg_type
+        self._ids_by_type = {
+            msg_type: self._message_ids[msg_type.__name__]
+            for msg_type in self._message_types.values()
+        }
+
+    def _encode_message(self, message: Struct) -> tuple[bytes, bytes, bytes]:
+        """Encode a message to frame parts (shared by sync and async)."""
+        msg_id = self._ids_by_type.get(type(message))
+        if msg_id is None:
+            msg_name = type(message).__name__
+            if msg_name not in self._message_ids:
+                raise ProtocolError(f"{msg_name} has no message ID")
+            msg_id = self._message_ids[msg_name]
+
+        payload = _ID_BYTES[msg_id] + message.pack()
+        return self._framer.encode_frame_parts(payload)
 
     def _decode_frame(self, frame: bytes) -> Struct:
         """Decode a frame to a message (shared by sync and async)."""
         msg_id = frame[0]
-        msg_data = frame[1:]
 
-        if msg_id not in self._message_types:
+        msg_type = self._types_by_id[msg_id]
+        if msg_type is None:
             raise ProtocolError(f"Received unknown message id {msg_id}")
 
-        msg_type = self._message_types[msg_id]
-        instance, _ = msg_type.unpack(msg_data)
+        # Unpack in place after the id byte rather than copying the body out
+        instance, _ = msg_type.unpack(frame, 1)
         return instance
 
     @overload
-    def send(self, message: Struct, *, async_: Literal[False] = False) -> None: ...
+    def send(
+        self, message: Struct, *, async_: Literal[False] = False, drain: bool = True
+    ) -> None: ...
 
     @overload
-    def send(self, message: Struct, *, async_: Literal[True]) -> Coroutine[Any, Any, None]: ...
+    def send(
+        self, message: Struct, *, async_: Literal[True], drain: bool = True
+    ) -> Coroutine[Any, Any, None]: ...
 
-    def send(self, message: Struct, *, async_: bool = False) -> None | Coroutine[Any, Any, None]:
+    def send(
+        self, message: Struct, *, async_: bool = False, drain: bool = True
+    ) -> None | Coroutine[Any, Any, None]:
         """Send a message over the protocol stream.
 
         Args:
             message: The message to send.
             async_: If True, returns a coroutine for async sending.
+            drain: For async sends, wait for the StreamWriter to drain after
+                writing. Pass False when sending a burst of messages and call
+                flush(async_=True) once afterwards.
 
         Returns:
             None for sync, or a coroutine for async.
         """
         if async_:
-            return self._send_async(message)
+            return self._send_async(message, drain)
 
         if self._stream is None:
             raise ProtocolError("Sync send requires a BufferedIOBase stream")
-        frame = self._encode_message(message)
-        self._stream.write(frame)
+        # Unbuffered streams would turn writelines() into one syscall per part
+        self._stream.write(b"".join(self._encode_message(message)))
         return None
 
-    async def _send_async(self, message: Struct) -> None:
+    async def _send_async(self, message: Struct, drain: bool) -> None:
         """Async implementation of send."""
         if self._async_writer is None:
             raise ProtocolError("Async send requires a StreamWriter")
-        frame = self._encode_message(message)
-        self._async_writer.write(frame)
+        # The transport can hand the parts to the socket without joining them
+        self._async_writer.writelines(self._encode_message(message))
+        if drain:
+            await self._async_writer.drain()
+
+    @overload
+    def flush(self, *, async_: Literal[False] = False) -> None: ...
+
+    @overload
+    def flush(self, *, async_: Literal[True]) -> Coroutine[Any, Any, None]: ...
+
+    def flush(self, *, async_: bool = False) -> Coroutine[Any, Any, None] | None:
+        """Flush messages written to the protocol stream.
+
+        Args:
+            async_: If True, returns a coroutine that waits for the
+                StreamWriter to drain.
+
+        Returns:
+            None for sync, or a coroutine for async.
+        """
+        if async_:
+            return self._flush_async()
+
+        if self._stream is None:
+            raise ProtocolError("Sync flush requires a BufferedIOBase stream")
+        self._stream.flush()
+        return None
+
+    async def _flush_async(self) -> None:
+        """Async implementation of flush."""
+        if self._async_writer is None:
+            raise ProtocolError("Async flush requires a StreamWriter")
         await self._async_writer.drain()
 
     @overload
@@ -150,19 +207,25 @@ class ProtocolBase:
             async_: If True, returns a coroutine for async polling.
 
         Returns:
-            A message if one is available, None otherwise.
-            For async, returns a coroutine.
+            Sync: a message if a complete one is available after a single read
+            from the stream, None otherwise. It does not wait for more data.
+            Async: a coroutine that waits until a complete message arrives and
+            returns it, or returns None once the StreamReader reaches EOF.
         """
         if async_:
             return self._poll_async()
 
         if self._stream is None:
             raise ProtocolError("Sync poll requires a BufferedIOBase stream")
-        data = self._stream.read(4096)
-        if data:
-            self._framer.append_buffer(data)
 
+        # Hand out frames left over from the last read before blocking on another
         frame = self._framer.decode_frame()
+        if not frame:
+            data = self._stream.read(4096)
+            if data:
+                self._framer.append_buffer(data)
+            frame = self._framer.decode_frame()
+
         if frame:
             return self._decode_frame(frame)
         return None
@@ -172,15 +235,24 @@ class ProtocolBase:
         if self._async_reader is None:
             raise ProtocolError("Async poll requires a StreamReader")
 
-        data = await self._async_reader.read(4096)
-        if data:
+        while True:
+            frame = self._framer.decode_frame()
+            if frame:
+                return self._decode_frame(frame)
+
+            # Let the reader find the delimiter; each read then ends on a frame
+            # boundary, or on the leading delimiter of the next frame
+            try:
+                data = await self._async_reader.readuntil(b"\x00")
+            except asyncio.IncompleteReadError as exc:
+                # Stream ended mid-frame; keep what arrived for the next poll
+                self._framer.append_buffer(exc.partial)
+                return None
+            except asyncio.LimitOverrunError as exc:
+                # Frame is bigger than the reader's buffer limit; take what it holds
+                data = await self._async_reader.read(exc.consumed)
             self._framer.append_buffer(data)
 
-        frame = self._framer.decode_frame()
-        if frame:
-            return self._decode_frame(frame)
-        return None
-
     @overload
     def messages(self, *, async_: Literal[False] = False) -> Iterator[Struct]: ...
 
@@ -196,7 +268,8 @@ class ProtocolBase:
             async_: If True, returns an async iterator.
 
         Returns:
-            An iterator (sync) or async iterator yielding messages.
+            An iterator (sync) or async iterator yielding messages. The async
+            iterator ends once the StreamReader reaches EOF.
 
         Example (sync):
             for msg in protocol.messages():
@@ -223,7 +296,7 @@ class ProtocolBase:
         """Async iterator over messages."""
         while True:
             msg = await self.poll(async_=True)
-            if msg is not None:
-                yield msg
-            else:
-                await asyncio.sleep(0.001)
+            if msg is None:
+                # Async poll waits for a whole frame, so None means the stream ended
+                return
+            yield msg
@@ -56,17 +56,19 @@ def bakelite_field(
 class Struct:
     """Base class for generated struct types.
 
-    Subclasses should be @dataclass decorated and define fields using
+    Subclasses should be @dataclass(slots=True) decorated and define fields using
     bakelite_field() or type annotations for nested structs.
 
     Example:
-        @dataclass
+        @dataclass(slots=True)
         class MyMessage(Struct):
             value: int = bakelite_field(type="uint8")
             name: str = bakelite_field(type="string", max_length=16)
             nested: OtherStruct  # no bakelite_field needed for structs
     """
 
+    __slots__ = ()
+
     def pack(self) -> bytes:
         """Pack this struct to bytes. Generated code overrides this."""
         raise NotImplementedError("pack() must be implemented by generated code")
@@ -63,6 +63,38 @@ def describe_gen_command():
         finally:
             os.unlink(output_file)
 
+    def failed_cpptiny_gen_keeps_existing_output(expect, tmp_path):
+        proto_file = tmp_path / "bad.bakelite"
+        proto_file.write_text("struct Broken {\n  a: Missing\n}\n")
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        output_file = out_dir / "out.h"
+        output_file.write_bytes(b"// previous good header\n")
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["gen", "-l", "cpptiny", "-i", str(proto_file), "-o", str(output_file)]
+        )
+        expect(result.exit_code) != 0
+        expect(output_file.read_bytes()) == b"// previous good header\n"
+        expect([p.name for p in out_dir.iterdir()]) == ["out.h"]
+
+    def writes_through_symlinked_output(expect, tmp_path):
+        target = tmp_path / "real.h"
+        target.write_bytes(b"")
+        target.chmod(0o640)
+        link = tmp_path / "link.h"
+        link.symlink_to(target)
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, ["gen", "-l", "cpptiny", "-i", f"{FILE_DIR}/struct.bakelite", "-o", str(link)]
+        )
+        expect(result.exit_code) == 0
+        expect(link.is_symlink()) == True
+        expect(target.stat().st_mode & 0o777) == 0o640
+        expect("struct TestStruct" in target.read_text()) == True
+
     def fails_with_unknown_language(expect):
         runner = CliRunner()
         result = runner.invoke(
@@ -113,7 +145,6 @@ def describe_runtime_command():
         finally:
             os.unlink(output_file)
 
-    @pytest.mark.skip(reason="runtime command added in a later PR")
     def generates_python_runtime(expect):
         runner = CliRunner()
         with tempfile.TemporaryDirectory() as tmpdir:
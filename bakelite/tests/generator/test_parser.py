@@ -129,6 +129,35 @@ def describe_parse_struct():
         )
         expect(structs[0].members[0].array_size) == 0
 
+    def parses_type_names_starting_with_primitives(expect):
+        _, structs, _, _ = parse(
+            """
+            struct int8Pair { a: int8 }
+            struct Outer { pair: int8Pair  flags: string[4][3] }
+        """
+        )
+        expect(structs[1].members[0].type.name) == "int8Pair"
+        expect(structs[1].members[1].type.name) == "string"
+        expect(structs[1].members[1].type.size) == 4
+        expect(structs[1].members[1].array_size) == 3
+
+    def parses_empty_comments(expect):
+        _, structs, _, comments = parse(
+            """
+            # Title
+            #
+            # details
+            struct Commented {
+                a: int8 #
+                #
+                b: int8
+            }
+        """
+        )
+        expect(comments) == [" Title", "", " details"]
+        expect([m.name for m in structs[0].members]) == ["a", "b"]
+        expect(structs[0].members[0].comment) == ""
+
     def parses_nested_struct_reference(expect):
         _, structs, _, _ = parse(
             """
@@ -160,6 +189,8 @@ def describe_parse_protocol():
         expect(len(proto.message_ids)) == 1
         expect(proto.message_ids[0].name) == "Message"
         expect(proto.message_ids[0].number) == 1
+        expect(proto.options_map) == {"maxLength": "256", "crc": "CRC8", "framing": "cobs"}
+        expect(proto.message_id_pairs) == [("Message", 1)]
 
     def parses_without_protocol_block(expect):
         _, structs, proto, _ = parse(
@@ -192,6 +223,16 @@ def describe_parse_annotations():
         expect(structs[0].annotations[0].name) == "version"
         expect(len(structs[0].annotations[0].arguments)) == 1
 
+    def parses_named_annotation_args(expect):
+        _, structs, _, _ = parse(
+            """
+            @range(min=0, max = 10)
+            struct Ranged { value: uint8 }
+        """
+        )
+        args = structs[0].annotations[0].arguments
+        expect([(a.name, a.value) for a in args]) == [("min", "0"), ("max", "10")]
+
 
 def describe_validation():
     def rejects_reserved_message_id_zero(expect):
@@ -230,6 +271,11 @@ def describe_parse_errors():
         with pytest.raises(Exception):
             parse("this is not valid syntax")
 
+    def rejects_non_identifier_annotation_arg_names(expect):
+        for annotation in ('@foo("k"=1)', "@foo(1=2)"):
+            with pytest.raises(Exception):
+                parse(annotation + "\nstruct Annotated { value: uint8 }")
+
     def rejects_unclosed_brace(expect):
         with pytest.raises(Exception):
             parse(
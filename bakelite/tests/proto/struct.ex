@@ -66,4 +66,9 @@ struct VariableLength {
   a: bytes[]
   b: string[]
   c: uint8[]
-}
\ No newline at end of file
+}
+struct NumericArrays {
+  a: uint8
+  b: uint16[3]
+  c: int8[2]
+}
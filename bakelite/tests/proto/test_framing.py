@@ -32,6 +32,10 @@ def describe_encoder():
         inpB = b"A" * 246
         expect(framing.encode(inpA + inpB)) == b"\xff" + inpA + b"\xf7" + inpB
 
+    def encode_254_bytes_then_null(expect):
+        inp = b"A" * 254
+        expect(framing.encode(inp + b"\x00")) == b"\xff" + inp + b"\x01\x01"
+
     def decode_zero_length(expect):
         expect(framing.decode(b"")) == b""
 
@@ -106,6 +110,10 @@ def describe_crc():
     def check_crc_16bit(expect):
         expect(framing.check_crc(b"hello world\xc19", crc_size=CrcSize.CRC16)) == b"hello world"
 
+    def check_crc_shorter_than_crc(expect):
+        with raises(framing.CRCCheckFailure):
+            framing.check_crc(b"\x00", crc_size=CrcSize.CRC16)
+
     def append_crc_32bit(expect):
         expect(
             framing.append_crc(b"hello world", crc_size=CrcSize.CRC32)
@@ -122,6 +130,14 @@ def describe_framer():
         framer = framing.Framer()
         expect(framer.encode_frame(b"hello\x00world")) == b"\x00\x06hello\x07world\x93\x00"
 
+    def encode_frame_parts(expect):
+        framer = framing.Framer()
+        expect(framer.encode_frame_parts(b"hello\x00world")) == (
+            b"\x00",
+            b"\x06hello\x07world\x93",
+            b"\x00",
+        )
+
     def encode_frame_no_crc(expect):
         framer = framing.Framer(crc=CrcSize.NO_CRC)
         expect(framer.encode_frame(b"hello\x00world")) == b"\x00\x06hello\x06world\x00"
@@ -135,6 +151,16 @@ def describe_framer():
         with raises(framing.EncodeError):
             framer.encode_frame(b"")
 
+    def uses_custom_codec(expect):
+        framer = framing.Framer(
+            encode_fn=lambda data: data[::-1], decode_fn=lambda data: data[::-1], crc=CrcSize.NO_CRC
+        )
+        encoded = framer.encode_frame(b"abc")
+        expect(encoded) == b"\x00cba\x00"
+
+        framer.append_buffer(encoded)
+        expect(framer.decode_frame()) == b"abc"
+
     def decode_frame(expect):
         framer = framing.Framer()
         framer.append_buffer(b"\x06hello\x07world\x93\x00")
@@ -2,11 +2,15 @@
 
 # pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned,singleton-comparison
 
+import asyncio
 import os
+import socket
 from io import BytesIO
 
 from bakelite.generator import parse
 from bakelite.generator.python import render
+from bakelite.proto.framing import Framer
+from bakelite.proto.runtime import ProtocolError
 
 FILE_DIR = dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -43,3 +47,92 @@ def describe_protocol():
         proto2 = Protocol(stream=stream)
         msg = proto2.poll()
         expect(msg) == Ack(code=111)
+
+    def test_unknown_crc(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+
+        with expect.raises(ProtocolError):
+            Protocol(stream=BytesIO(), crc="crc64")
+
+    def test_message_id_too_large(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+        Ack = gen["Ack"]
+
+        WideProtocol = type(
+            "WideProtocol",
+            (Protocol,),
+            {"_message_types": {300: Ack}, "_message_ids": {"Ack": 300}},
+        )
+
+        with expect.raises(ProtocolError):
+            WideProtocol(stream=BytesIO())
+
+    def test_unknown_message_id(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+
+        stream = BytesIO(Framer().encode_frame(b"\xc8\x01"))
+        proto = Protocol(stream=stream)
+        with expect.raises(ProtocolError):
+            proto.poll()
+
+    def test_send_subclass_by_name(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+        Ack = gen["Ack"]
+
+        AckSubclass = type("Ack", (Ack,), {})
+
+        stream = BytesIO()
+        Protocol(stream=stream).send(AckSubclass(code=111))
+        expect(stream.getvalue()) == b"\x00\x04\x02o \x00"
+
+    def test_async_poll(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+        Ack = gen["Ack"]
+
+        async def run():
+            reader = asyncio.StreamReader()
+            proto = Protocol(stream=(reader, None))
+            frame = b"\x00\x04\x02o \x00"
+            reader.feed_data(frame + frame + frame[:3])
+            reader.feed_eof()
+            return [await proto.poll(async_=True) for _ in range(3)]
+
+        expect(asyncio.run(run())) == [Ack(code=111), Ack(code=111), None]
+
+    def test_async_messages_end_at_eof(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+        Ack = gen["Ack"]
+
+        async def run():
+            reader = asyncio.StreamReader()
+            proto = Protocol(stream=(reader, None))
+            reader.feed_data(b"\x00\x04\x02o \x00" * 2)
+            reader.feed_eof()
+            return [msg async for msg in proto.messages(async_=True)]
+
+        expect(asyncio.run(run())) == [Ack(code=111), Ack(code=111)]
+
+    def test_async_send_burst(expect):
+        gen = gen_code(FILE_DIR + "/protocol.ex")
+        Protocol = gen["Protocol"]
+        Ack = gen["Ack"]
+
+        async def run():
+            local, remote = socket.socketpair()
+            with remote:
+                reader, writer = await asyncio.open_connection(sock=local)
+                proto = Protocol(stream=(reader, writer))
+                for _ in range(3):
+                    await proto.send(Ack(code=111), async_=True, drain=False)
+                await proto.flush(async_=True)
+                writer.close()
+                await writer.wait_closed()
+                return remote.recv(64)
+
+        expect(asyncio.run(run())) == b"\x00\x04\x02o \x00" * 3
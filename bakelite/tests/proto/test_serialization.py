@@ -37,6 +37,12 @@ def describe_serialization():
         expect(recovered) == Ack(code=123)
         expect(consumed) == 1
 
+    def test_structs_use_slots(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        Ack = gen["Ack"]
+
+        expect(hasattr(Ack(code=1), "__dict__")) == False
+
     def test_complex_struct(expect):
         gen = gen_code(FILE_DIR + "/struct.ex")
         TestStruct = gen["TestStruct"]
@@ -71,6 +77,50 @@ def describe_serialization():
         expect(new_struct.data) == b"\x01\x02\x03\x04"
         expect(new_struct.str) == "hey"
 
+    def test_short_fixed_bytes_are_padded(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        TestStruct = gen["TestStruct"]
+
+        test_struct = TestStruct(
+            int1=0,
+            int2=0,
+            uint1=0,
+            uint2=0,
+            float1=0.0,
+            b1=False,
+            b2=False,
+            b3=False,
+            data=b"\x01\x02",
+            str="",
+        )
+
+        packed = test_struct.pack()
+        expect(packed[15:19]) == b"\x01\x02\x00\x00"
+
+        new_struct, _ = TestStruct.unpack(packed)
+        expect(new_struct.data) == b"\x01\x02\x00\x00"
+
+    def test_unpack_from_memoryview(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        TestStruct = gen["TestStruct"]
+
+        test_struct = TestStruct(
+            int1=5,
+            int2=-1234,
+            uint1=31,
+            uint2=1234,
+            float1=0.5,
+            b1=True,
+            b2=True,
+            b3=False,
+            data=b"\x01\x02\x03\x04",
+            str="hey",
+        )
+
+        new_struct, consumed = TestStruct.unpack(memoryview(test_struct.pack()))
+        expect(new_struct) == test_struct
+        expect(isinstance(new_struct.data, bytes)) == True
+
     def test_enum_struct(expect):
         gen = gen_code(FILE_DIR + "/struct.ex")
         EnumStruct = gen["EnumStruct"]
@@ -141,6 +191,18 @@ def describe_serialization():
         )
         expect(consumed) == len(packed)
 
+    def test_numeric_arrays(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        NumericArrays = gen["NumericArrays"]
+
+        test_struct = NumericArrays(a=7, b=[1, 2, 0x300], c=[-1, 5])
+        packed = test_struct.pack()
+        expect(packed) == b"\x07\x01\x00\x02\x00\x00\x03\xff\x05"
+
+        recovered, consumed = NumericArrays.unpack(packed)
+        expect(recovered) == test_struct
+        expect(consumed) == len(packed)
+
     def test_variable_types(expect):
         gen = gen_code(FILE_DIR + "/struct.ex")
         VariableLength = gen["VariableLength"]
@@ -161,8 +223,34 @@ def describe_serialization():
         )
         expect(consumed) == len(packed)
 
+        recovered, consumed = VariableLength.unpack(b"\x01" + packed, 1)
+        expect(recovered) == test_struct
+        expect(consumed) == len(packed)
+
+    def test_sequential_unpack_from_large_buffer(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        VariableLength = gen["VariableLength"]
+
+        def unpack_all(data):
+            offset = 0
+            recovered = []
+            while offset < len(data):
+                record, consumed = VariableLength.unpack(data, offset)
+                recovered.append(record)
+                offset += consumed
+            return recovered
+
+        class NoWholeCopy(bytearray):
+            # Each unpack must only copy its own fields, never the whole buffer
+            def __bytes__(self):
+                raise AssertionError("unpack copied the whole input buffer")
+
+        records = [VariableLength(a=b"\x01\x02", b=f"r{i}", c=[i % 256]) for i in range(2000)]
+        packed = b"".join(r.pack() for r in records)
+
+        expect(unpack_all(NoWholeCopy(packed))) == records
+        expect(unpack_all(memoryview(b"".join(r.pack() for r in records[:200])))) == records[:200]
 
-def describe_error_handling():
     def rejects_bytes_too_long(expect):
         gen = gen_code(FILE_DIR + "/struct.ex")
         VariableLength = gen["VariableLength"]
@@ -194,6 +282,13 @@ def describe_error_handling():
         # The struct will pack but produce wrong output
         # For proper validation, user should validate before packing
 
+    def rejects_wrong_numeric_array_length(expect):
+        gen = gen_code(FILE_DIR + "/struct.ex")
+        NumericArrays = gen["NumericArrays"]
+
+        with raises(SerializationError):
+            NumericArrays(a=1, b=[1, 2], c=[1, 2]).pack()
+
     def rejects_variable_array_too_long(expect):
         gen = gen_code(FILE_DIR + "/struct.ex")
         VariableLength = gen["VariableLength"]
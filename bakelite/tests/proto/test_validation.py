@@ -70,6 +70,27 @@ def describe_validation():
 
         expect(str(exinfo.value)).includes("Message ID 0 is reserved for future use")
 
+    def test_message_id_too_large(expect):
+        code = """
+      struct TestStruct {
+        a: uint8
+      }
+
+      protocol {
+        maxLength = 256
+        crc = CRC8
+        framing = cobs
+
+        messageIds {
+          TestStruct = 300
+        }
+      }
+    """
+        with pytest.raises(ValidationError) as exinfo:
+            gen = gen_code(code)
+
+        expect(str(exinfo.value)).includes("Message ID 300 for TestStruct does not fit in one byte")
+
     def test_missing_message_id_struct(expect):
         code = """
       struct TestStruct {
@@ -18,8 +18,9 @@ finally:
         sys.path.remove(_runtime_path)
 
 
-@dataclass
+@dataclass(slots=True)
 class TestMessage(Struct):
+    _STRUCT_0: ClassVar[_struct.Struct] = _struct.Struct("=Bi?")
     a: int = bakelite_field(type="uint8")
     b: int = bakelite_field(type="int32")
     status: bool = bakelite_field(type="bool")
@@ -27,7 +28,7 @@ class TestMessage(Struct):
 
     def pack(self) -> bytes:
         _buf = bytearray()
-        _buf.extend(_struct.pack("=Bi?", self.a, self.b, self.status))
+        _buf.extend(self._STRUCT_0.pack(self.a, self.b, self.status))
         _enc_message = self.message.encode("ascii")
         if len(_enc_message) >= 16:
             raise SerializationError("message exceeds 15 chars")
@@ -38,23 +39,24 @@ class TestMessage(Struct):
     @classmethod
     def unpack(cls, _data: bytes | memoryview, offset: int = 0) -> tuple[Self, int]:
         _o = offset
-        a, b, status = _struct.unpack_from("=Bi?", _data, _o)
+        a, b, status = cls._STRUCT_0.unpack_from(_data, _o)
         _o += 6
-        _raw_message = _data[_o:_o + 16]
+        _raw_message = bytes(_data[_o:_o + 16])
         _null_message = _raw_message.find(b"\x00")
-        message = bytes(_raw_message[:_null_message if _null_message >= 0 else 16]).decode("ascii")
+        message = _raw_message[:_null_message if _null_message >= 0 else 16].decode("ascii")
         _o += 16
         return cls(a, b, status, message), _o - offset
 
 
-@dataclass
+@dataclass(slots=True)
 class Ack(Struct):
+    _STRUCT_0: ClassVar[_struct.Struct] = _struct.Struct("=B")
     code: int = bakelite_field(type="uint8")
     message: str = bakelite_field(type="string", max_length=64)
 
     def pack(self) -> bytes:
         _buf = bytearray()
-        _buf.extend(_struct.pack("=B", self.code))
+        _buf.extend(self._STRUCT_0.pack(self.code))
         _enc_message = self.message.encode("ascii")
         if len(_enc_message) >= 64:
             raise SerializationError("message exceeds 63 chars")
@@ -65,11 +67,11 @@ class Ack(Struct):
     @classmethod
     def unpack(cls, _data: bytes | memoryview, offset: int = 0) -> tuple[Self, int]:
         _o = offset
-        code, = _struct.unpack_from("=B", _data, _o)
+        code, = cls._STRUCT_0.unpack_from(_data, _o)
         _o += 1
-        _raw_message = _data[_o:_o + 64]
+        _raw_message = bytes(_data[_o:_o + 64])
         _null_message = _raw_message.find(b"\x00")
-        message = bytes(_raw_message[:_null_message if _null_message >= 0 else 64]).decode("ascii")
+        message = _raw_message[:_null_message if _null_message >= 0 else 64].decode("ascii")
         _o += 64
         return cls(code, message), _o - offset
 